@@ -1,9 +1,12 @@
 import os
 import json
+import queue
+import threading
+from concurrent.futures import Future
 import numpy as np
 import faiss
 from openai import OpenAI
-from typing import List, Dict
+from typing import List, Dict, Sequence
 
 # ------------------- CONFIGURACIÓN NECESARIA -------------------
 CARPETA_RAG = "./mi_rag"  # Carpeta donde se guardó Faiss y los chunks
@@ -14,6 +17,17 @@ LM_STUDIO_URL = "http://localhost:1234/v1"
 # Modelos (DEBEN estar corriendo como servidores en LM Studio)
 NOMBRE_EMBEDDING_MODELO = "text-embedding-nomic-embed-text-v2-moe" 
 NOMBRE_CHAT_MODELO = "openai/gpt-oss-20b"
+
+# Las preguntas se vectorizan con el MISMO modelo que generó el índice, según
+# mi_rag/embedder.json: LM Studio, o sentence-transformers en local si el índice se
+# construyó con USAR_EMBEDDING_LOCAL (requiere: pip install sentence-transformers).
+
+# Prompt de sistema (estable entre llamadas para aprovechar la caché de prefijo del LLM)
+PROMPT_SISTEMA = (
+    "Eres un asistente de respuesta de preguntas que utiliza la información proporcionada en el Contexto para responder "
+    "concisa y con precisión. Si la respuesta no está en el Contexto, indica claramente que no tienes suficiente información. "
+    "NO inventes información."
+)
 # ---------------------------------------------------------------
 
 # Conexión a la API de LM Studio
@@ -26,51 +40,204 @@ except Exception as e:
 # ----------------------------------------
 ## 1. Carga del Índice y del Contexto
 # ----------------------------------------
+class MetadatosArrow:
+    """Acceso por posición a chunks.arrow mapeado en memoria.
+
+    Se comporta como la lista de dicts de chunks.json (len() y metadatos[idx]), pero
+    solo convierte a Python la fila pedida; el resto queda en el archivo mapeado.
+    """
+
+    def __init__(self, ruta: str):
+        import pyarrow as pa
+        self._tabla = pa.ipc.open_file(pa.memory_map(ruta, "r")).read_all()
+        self._chunk_id = self._tabla.column("chunk_id")
+        self._fuente = self._tabla.column("fuente")
+        self._texto = self._tabla.column("texto")
+
+    def __len__(self) -> int:
+        return self._tabla.num_rows
+
+    def __getitem__(self, idx: int) -> Dict:
+        idx = int(idx)
+        return {
+            "chunk_id": self._chunk_id[idx].as_py(),
+            "fuente": self._fuente[idx].as_py(),
+            "texto": self._texto[idx].as_py(),
+        }
+
+def cargar_metadatos(carpeta: str) -> Sequence[Dict]:
+    """Carga los chunks desde chunks.arrow (mapeado en memoria) o, si no existe, desde chunks.json."""
+    ruta_arrow = os.path.join(carpeta, "chunks.arrow")
+    if os.path.exists(ruta_arrow):
+        try:
+            return MetadatosArrow(ruta_arrow)
+        except ImportError:
+            print("ADVERTENCIA: Existe chunks.arrow pero no tienes pyarrow. Instálalo con: pip install pyarrow")
+            raise
+    with open(os.path.join(carpeta, "chunks.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+# Tipos de índice sin listas invertidas cuyos códigos se guardan en un solo bloque
+# (IndexFlatCodes): FlatL2, FlatIP, ScalarQuantizer y PQ
+FOURCC_CODIGOS_PLANOS = {b"IxF2", b"IxFI", b"IxSQ", b"IxPq"}
+
+def flags_mmap_indice(ruta_index: str) -> int:
+    """Elige los flags de lectura según el tipo de índice (los 4 primeros bytes del archivo).
+
+    IO_FLAG_MMAP solo mapea las listas invertidas de los IVF; los índices planos o
+    con cuantización escalar necesitan IO_FLAG_MMAP_IFC. Los dos juntos no sirven
+    (el IVF falla al cargar), y los tipos que no admiten ninguno se leen completos.
+    """
+    with open(ruta_index, "rb") as f:
+        fourcc = f.read(4)
+    if fourcc.startswith(b"Iw"):
+        return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    if fourcc in FOURCC_CODIGOS_PLANOS:
+        return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+    return 0
+
 def cargar_base_de_datos(carpeta: str):
     """Carga el índice FAISS y los chunks de texto."""
     print("⏳ Cargando índice FAISS y chunks...")
     try:
-        index = faiss.read_index(os.path.join(carpeta, "faiss.index"))
-        with open(os.path.join(carpeta, "chunks.json"), "r", encoding="utf-8") as f:
-            metadatos = json.load(f)
+        ruta_index = os.path.join(carpeta, "faiss.index")
+        if not os.path.exists(ruta_index):
+            raise FileNotFoundError(ruta_index)
+        # Mapea el archivo en memoria: las páginas se cargan bajo demanda y se
+        # comparten entre procesos, en vez de copiar todo el índice a la RAM
+        index = faiss.read_index(ruta_index, flags_mmap_indice(ruta_index))
+        # Usa todos los núcleos (algunas builds de faiss arrancan con 1 solo hilo)
+        faiss.omp_set_num_threads(os.cpu_count() or 1)
+        if isinstance(index, faiss.IndexIVF):
+            # Número de listas invertidas que se recorren por consulta
+            index.nprobe = min(16, index.nlist)
+            # Paraleliza también dentro de una misma consulta (sobre las listas invertidas),
+            # no solo entre consultas: con nq=1 el modo por defecto usa un único núcleo
+            index.parallel_mode = 1
+        metadatos = cargar_metadatos(carpeta)
         print("✅ Base de datos cargada correctamente.")
         return index, metadatos
     except FileNotFoundError as e:
-        print(f"❌ ERROR: Archivos FAISS o JSON no encontrados en {carpeta}. Ejecuta primero el script de indexación.")
+        print(f"❌ ERROR: Archivos FAISS o de chunks no encontrados en {carpeta}. Ejecuta primero el script de indexación.")
         raise e
 
 index, metadatos = cargar_base_de_datos(CARPETA_RAG)
 
+def leer_embedder(carpeta: str) -> Dict:
+    """Lee qué modelo generó los embeddings del índice (los índices antiguos usaban LM Studio)."""
+    ruta = os.path.join(carpeta, "embedder.json")
+    if not os.path.exists(ruta):
+        return {"tipo": "lm_studio", "modelo": NOMBRE_EMBEDDING_MODELO}
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def cargar_embedding_local(embedder: Dict, dimension: int):
+    """Carga en el proceso el modelo con el que se indexó (GPU si hay); None si el índice es de LM Studio."""
+    if embedder["tipo"] != "local":
+        if embedder["modelo"] != NOMBRE_EMBEDDING_MODELO:
+            print(f"ADVERTENCIA: El índice se generó con '{embedder['modelo']}' pero se usará '{NOMBRE_EMBEDDING_MODELO}'.")
+        return None
+    # Vectorizar las preguntas con otro modelo daría vectores de otro espacio: no hay alternativa
+    try:
+        import torch
+        from sentence_transformers import SentenceTransformer
+        dispositivo = "cuda" if torch.cuda.is_available() else "cpu"
+        modelo = SentenceTransformer(embedder["modelo"], device=dispositivo, trust_remote_code=True)
+    except Exception as e:
+        print(f"❌ ERROR: El índice se generó en local con '{embedder['modelo']}' y no se pudo cargar ({e}).")
+        print("Instala sentence-transformers o vuelve a indexar con LM Studio (USAR_EMBEDDING_LOCAL = False).")
+        exit()
+    if modelo.get_sentence_embedding_dimension() != dimension:
+        print(f"❌ ERROR: '{embedder['modelo']}' no coincide con la dimensión del índice ({dimension}).")
+        exit()
+    print(f"✅ Embeddings de preguntas en local ({embedder['modelo']}, {dispositivo}).")
+    return modelo
+
+embedder = leer_embedder(CARPETA_RAG)
+modelo_embedding_local = cargar_embedding_local(embedder, index.d)
+
+# ----------------------------------------
+## 1.1 Búsqueda FAISS por Lotes
+# ----------------------------------------
+# Las consultas que llegan casi a la vez (p. ej. desde varios usuarios de un frontend)
+# se agrupan en una sola llamada index.search(Q, k) con Q de forma (n, d): FAISS la
+# resuelve como una multiplicación de matrices en vez de n productos vector-vector.
+# No hay ventana de espera: se agrupa lo que ya está en la cola, así una consulta sola
+# (el CLI) se busca al instante y, con concurrencia, las que llegan mientras corre una
+# búsqueda se acumulan y se resuelven juntas en la siguiente.
+MAX_BATCH_BUSQUEDA = 8
+
+cola_busquedas: "queue.Queue" = queue.Queue()
+
+def despachador_busquedas():
+    """Hilo que junta consultas pendientes y las resuelve en una sola búsqueda por índice."""
+    while True:
+        pendientes = [cola_busquedas.get()]
+        while len(pendientes) < MAX_BATCH_BUSQUEDA:
+            try:
+                pendientes.append(cola_busquedas.get_nowait())
+            except queue.Empty:
+                break
+
+        # Agrupa por índice (normalmente hay uno solo) y busca con el mayor k pedido
+        grupos: Dict[int, list] = {}
+        for item in pendientes:
+            grupos.setdefault(id(item[1]), []).append(item)
+        for items in grupos.values():
+            try:
+                # np.stack devuelve una matriz (n, d) C-contigua, como la espera FAISS
+                Q = np.stack([vector for vector, _, _, _ in items])
+                k_max = max(k for _, _, k, _ in items)
+                D, I = items[0][1].search(Q, k_max)
+                for fila, (_, _, k, futuro) in enumerate(items):
+                    futuro.set_result((D[fila, :k], I[fila, :k]))
+            except Exception as e:
+                for _, _, _, futuro in items:
+                    futuro.set_exception(e)
+
+threading.Thread(target=despachador_busquedas, daemon=True).start()
+
+def buscar_por_lotes(vector_pregunta: np.ndarray, index: faiss.Index, k: int):
+    """Encola una consulta para el despachador y espera sus (similitudes, índices)."""
+    futuro = Future()
+    cola_busquedas.put((vector_pregunta.astype('float32', copy=False), index, k, futuro))
+    return futuro.result()
+
 # ----------------------------------------
 ## 2. Funciones de Búsqueda y Generación
 # ----------------------------------------
 
 def vectorizar_pregunta(pregunta: str) -> np.ndarray:
-    """Convierte la pregunta en un vector usando el modelo Nomic (via LM Studio)."""
+    """Convierte la pregunta en un vector usando el modelo Nomic (en local o via LM Studio)."""
     try:
+        if modelo_embedding_local is not None:
+            # Vectoriza en el propio proceso, ya normalizado
+            v = modelo_embedding_local.encode(pregunta, normalize_embeddings=True)
+            return np.ascontiguousarray(v, dtype='float32')
+
         # Pide a la API de LM Studio que vectorice la pregunta
         respuesta = cliente_api.embeddings.create(
             model=NOMBRE_EMBEDDING_MODELO,
             input=[pregunta]
         )
-        # Retorna el primer y único embedding
-        return np.array(respuesta.data[0].embedding, dtype='float32')
+        # Retorna el primer y único embedding, normalizado (el índice usa producto interno)
+        v = np.array(respuesta.data[0].embedding, dtype='float32')
+        return np.ascontiguousarray(v / np.linalg.norm(v), dtype='float32')
     except Exception as e:
         print(f"❌ ERROR al vectorizar la pregunta: {e}")
         return None
 
-def buscar_contexto(vector_pregunta: np.ndarray, index: faiss.Index, metadatos: List[Dict], k: int = 4) -> str:
+def buscar_contexto(vector_pregunta: np.ndarray, index: faiss.Index, metadatos: Sequence[Dict], k: int = 4) -> str:
     """Busca los K chunks más relevantes en FAISS y forma el contexto."""
     
-    # 1. Búsqueda FAISS: Distancias (D) e Índices (I)
-    vector_pregunta = vector_pregunta.reshape(1, -1) # Formato requerido por Faiss
-    D, I = index.search(vector_pregunta, k) 
+    # 1. Búsqueda FAISS (agrupada con otras consultas concurrentes): Similitudes (D) e Índices (I)
+    D, I = buscar_por_lotes(vector_pregunta, index, k)
 
     contextos_recuperados = []
     fuentes_usadas = set()
 
     # 2. Recuperar el texto original (chunks)
-    for idx in I[0]:
+    for idx in I:
         if idx >= 0 and idx < len(metadatos):
             chunk = metadatos[idx]
             contextos_recuperados.append(f"--- Fuente: {chunk['fuente']} ---\n{chunk['texto']}")
@@ -86,12 +253,7 @@ def generar_respuesta(pregunta: str, contexto: str) -> str:
     """Envía la pregunta y el contexto al LLM (gpt-oss-20b) para generar la respuesta."""
     
     # 1. Crea el Prompt Aumentado (System Prompt + Contexto + Pregunta)
-    prompt_sistema = (
-        "Eres un asistente de respuesta de preguntas que utiliza la información proporcionada en el Contexto para responder "
-        "concisa y con precisión. Si la respuesta no está en el Contexto, indica claramente que no tienes suficiente información. "
-        "NO inventes información."
-    )
-    
+    # El system prompt es fijo y va primero: así el servidor puede reutilizar su KV-cache
     prompt_usuario = (
         f"Contexto:\n---\n{contexto}\n---\n\n"
         f"Pregunta: {pregunta}"
@@ -100,26 +262,77 @@ def generar_respuesta(pregunta: str, contexto: str) -> str:
     # 2. Llama a la API de Chat (LM Studio emula el endpoint de Chat de OpenAI)
     print("🤖 Generando respuesta con el LLM...")
     try:
-        response = cliente_api.chat.completions.create(
+        stream = cliente_api.chat.completions.create(
             model=NOMBRE_CHAT_MODELO,
             messages=[
-                {"role": "system", "content": prompt_sistema},
+                {"role": "system", "content": PROMPT_SISTEMA},
                 {"role": "user", "content": prompt_usuario}
             ],
-            temperature=0.1 # Baja temperatura para respuestas más fácticas
+            temperature=0.1, # Baja temperatura para respuestas más fácticas
+            # Pide al servidor (llama.cpp y compatibles) reutilizar el prefijo ya procesado
+            extra_body={"cache_prompt": True},
+            # Recibe los tokens a medida que se generan (y el uso de tokens al final)
+            stream=True,
+            stream_options={"include_usage": True}
         )
-        return response.choices[0].message.content
+
+        # 3. Muestra cada fragmento en cuanto llega
+        print("\n" + "-"*50)
+        print("💡 Respuesta del LLM:")
+        partes = []
+        uso = None
+        for chunk in stream:
+            if chunk.usage is not None:
+                uso = chunk.usage
+            if chunk.choices:
+                token = chunk.choices[0].delta.content or ""
+                print(token, end="", flush=True)
+                partes.append(token)
+        print()
+        if uso is not None:
+            print(f"📊 Tokens: {uso.prompt_tokens} de entrada + {uso.completion_tokens} generados")
+        return "".join(partes)
     except Exception as e:
         return f"❌ ERROR al comunicarse con el LLM '{NOMBRE_CHAT_MODELO}'. Asegúrate que esté corriendo en LM Studio: {e}"
 
 
 # ----------------------------------------
-## 3. Bucle Principal de Preguntas
+## 3. Caché Semántica de Preguntas
+# ----------------------------------------
+# Guarda las últimas preguntas (vector normalizado) y sus respuestas. Si llega una
+# pregunta casi idéntica (similitud coseno > UMBRAL), se reutiliza la respuesta
+# sin volver a buscar en FAISS ni llamar al LLM.
+CACHE_MAX_PREGUNTAS = 256
+CACHE_UMBRAL_SIMILITUD = 0.97
+
+q_cache_vecs = np.empty((0, index.d), dtype='float32')
+q_cache_ans: List[str] = []
+
+def buscar_en_cache(vector_pregunta: np.ndarray):
+    """Devuelve la respuesta cacheada más similar, o None si ninguna supera el umbral."""
+    if not q_cache_ans:
+        return None
+    # Los vectores ya vienen normalizados: el producto interno es la similitud coseno
+    sims = q_cache_vecs @ vector_pregunta
+    mejor = int(np.argmax(sims))
+    if sims[mejor] > CACHE_UMBRAL_SIMILITUD:
+        return q_cache_ans[mejor]
+    return None
+
+def guardar_en_cache(vector_pregunta: np.ndarray, respuesta: str):
+    """Agrega el par (pregunta, respuesta) a la caché, expulsando la más antigua si está llena."""
+    global q_cache_vecs, q_cache_ans
+    q_cache_vecs = np.vstack([q_cache_vecs, vector_pregunta.reshape(1, -1)])[-CACHE_MAX_PREGUNTAS:]
+    q_cache_ans = (q_cache_ans + [respuesta])[-CACHE_MAX_PREGUNTAS:]
+
+# ----------------------------------------
+## 4. Bucle Principal de Preguntas
 # ----------------------------------------
 def bucle_preguntas():
     print("\n" + "="*50)
     print("      Sistema RAG Local Listo. ¡Haz tu pregunta!")
-    print(f"LLM: {NOMBRE_CHAT_MODELO} | Embeddings: {NOMBRE_EMBEDDING_MODELO}")
+    nombre_embeddings = embedder["modelo"] + " (local)" if modelo_embedding_local is not None else NOMBRE_EMBEDDING_MODELO
+    print(f"LLM: {NOMBRE_CHAT_MODELO} | Embeddings: {nombre_embeddings}")
     print("Escribe 'salir' para terminar.")
     print("="*50 + "\n")
 
@@ -136,17 +349,25 @@ def bucle_preguntas():
         vector_pre = vectorizar_pregunta(pregunta)
         if vector_pre is None:
             continue
+
+        # 2. Reutilizar la respuesta si ya se hizo una pregunta equivalente
+        respuesta_final = buscar_en_cache(vector_pre)
+        if respuesta_final is not None:
+            print("\n" + "-"*50)
+            print("💡 Respuesta del LLM (caché):")
+            print(respuesta_final)
+            print("-"*50 + "\n")
+            continue
         
-        # 2. Buscar contexto en Faiss
+        # 3. Buscar contexto en Faiss
         contexto = buscar_contexto(vector_pre, index, metadatos)
         
-        # 3. Generar respuesta aumentada
+        # 4. Generar respuesta aumentada (se muestra mientras se genera)
         respuesta_final = generar_respuesta(pregunta, contexto)
-        
-        # 4. Mostrar resultado
-        print("\n" + "-"*50)
-        print("💡 Respuesta del LLM:")
-        print(respuesta_final)
+        if respuesta_final.startswith("❌"):
+            print(respuesta_final)
+        else:
+            guardar_en_cache(vector_pre, respuesta_final)
         print("-"*50 + "\n")
 
 # Inicia el programa
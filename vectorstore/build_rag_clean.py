@@ -1,12 +1,17 @@
 import os
 import json
+import math
+import hashlib
 import glob
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from tqdm import tqdm
+from tqdm.asyncio import tqdm
 import numpy as np
 import faiss
 
 # Asegúrate de tener instalado: pip install openai numpy faiss-cpu tqdm PyPDF2
+# Opcional (metadatos mapeados en memoria): pip install pyarrow
+# Opcional (embeddings en local): pip install sentence-transformers
 
 # ------------------- CONFIGURACIÓN NECESARIA -------------------
 # Directorios
@@ -20,151 +25,385 @@ NOMBRE_MODELO_NOMIC = "text-embedding-nomic-embed-text-v2-moe"
 
 # Configuración de la API de LM Studio (Puerto por defecto 1234)
 LM_STUDIO_URL = "http://localhost:1234/v1" 
-# ---------------------------------------------------------------
 
-# Creamos la carpeta de salida si no existe
-os.makedirs(CARPETA_RAG, exist_ok=True)
+# Embeddings en local con sentence-transformers (opcional: pip install sentence-transformers).
+# Si se activa, los chunks se vectorizan con este modelo en vez de con LM Studio, y chat.py
+# usará el mismo modelo en local para las preguntas (lo lee de mi_rag/embedder.json).
+USAR_EMBEDDING_LOCAL = False
+NOMBRE_EMBEDDING_LOCAL = "nomic-ai/nomic-embed-text-v2-moe"
+# ---------------------------------------------------------------
 
 # ----------------------------------------
 ## 1. Carga de Documentos
 # ----------------------------------------
-print("📚 Leyendo documentos de la carpeta:", CARPETA_DOCUMENTOS)
-textos = []
-fuentes = []
+# Cada archivo se procesa en un proceso aparte (la extracción de PyPDF2 es Python puro
+# y usa CPU), por eso los lectores están a nivel de módulo: deben poder serializarse.
+def _leer_txt(archivo):
+    try:
+        with open(archivo, "r", encoding="utf-8") as f:
+            return f.read()
+    except Exception as e:
+        print(f"Error al leer TXT {archivo}: {e}")
+        return None
+
+def _leer_pdf(archivo):
+    from PyPDF2 import PdfReader
+    try:
+        reader = PdfReader(archivo)
+        texto = ""
+        for page in reader.pages:
+            # Usamos .get('/Contents') para asegurar que extraiga contenido válido
+            texto += page.extract_text() + "\n"
+        return texto
+    except Exception as e:
+        print(f"Error al procesar PDF {archivo}: {e}")
+        return None
+
+def _leer_en_paralelo(lector, archivos):
+    """Aplica 'lector' a cada archivo en varios procesos y devuelve (textos, fuentes) en orden."""
+    textos = []
+    fuentes = []
+    if not archivos:
+        return textos, fuentes
+    with ProcessPoolExecutor() as ex:
+        for archivo, texto in zip(archivos, ex.map(lector, archivos, chunksize=4)):
+            if texto is not None:
+                textos.append(texto)
+                fuentes.append(os.path.relpath(archivo, CARPETA_DOCUMENTOS))
+    return textos, fuentes
 
 # Función para cargar TXT
 def cargar_txt():
-    for archivo in glob.glob(f"{CARPETA_DOCUMENTOS}/**/*.txt", recursive=True):
-        try:
-            with open(archivo, "r", encoding="utf-8") as f:
-                textos.append(f.read())
-                fuentes.append(os.path.relpath(archivo, CARPETA_DOCUMENTOS))
-        except Exception as e:
-            print(f"Error al leer TXT {archivo}: {e}")
+    archivos = glob.glob(f"{CARPETA_DOCUMENTOS}/**/*.txt", recursive=True)
+    return _leer_en_paralelo(_leer_txt, archivos)
 
 # Función para cargar PDF
 def cargar_pdf():
     try:
-        from PyPDF2 import PdfReader
-        for archivo in glob.glob(f"{CARPETA_DOCUMENTOS}/**/*.pdf", recursive=True):
-            try:
-                reader = PdfReader(archivo)
-                texto = ""
-                for page in reader.pages:
-                    # Usamos .get('/Contents') para asegurar que extraiga contenido válido
-                    texto += page.extract_text() + "\n"
-                textos.append(texto)
-                fuentes.append(os.path.relpath(archivo, CARPETA_DOCUMENTOS))
-            except Exception as e:
-                print(f"Error al procesar PDF {archivo}: {e}")
+        import PyPDF2  # noqa: F401 (solo comprobamos que esté instalado)
     except ImportError:
         print("ADVERTENCIA: No tienes PyPDF2. Solo se procesarán .txt.")
         print("Instálalo con: pip install PyPDF2")
-
-cargar_txt()
-cargar_pdf()
-
-if not textos:
-    print("❌ No se encontraron documentos para procesar. ¡Asegúrate de que 'context_files' no esté vacío!")
-    exit()
+        return [], []
+    archivos = glob.glob(f"{CARPETA_DOCUMENTOS}/**/*.pdf", recursive=True)
+    return _leer_en_paralelo(_leer_pdf, archivos)
 
 # ----------------------------------------
 ## 2. División en Chunks (Fragmentación)
 # ----------------------------------------
+def iterar_chunks(texto, tamano=1000, overlap=200):
+    """Genera los fragmentos de un texto con superposición, sin construir la lista."""
+    paso = max(tamano - overlap, 1)
+    # Los inicios están precalculados: el último es el primero cuyo fragmento llega al final
+    inicios = range(0, max(len(texto) - tamano, 0) + paso, paso) if texto else range(0)
+    return (texto[inicio:inicio + tamano] for inicio in inicios)
+
 def dividir_texto(texto, tamano=1000, overlap=200):
     """Divide un texto largo en fragmentos con superposición."""
-    chunks = []
-    inicio = 0
-    while inicio < len(texto):
-        fin = inicio + tamano
-        chunk = texto[inicio:fin]
-        chunks.append(chunk)
-        # Evita ir hacia atrás si el chunk es el último y más pequeño que el overlap
-        inicio = max(fin - overlap, inicio + 1)
-        if fin >= len(texto):
-            break
-    return chunks
-
-todos_los_chunks = []
-metadatos = []
-
-print("✂️ Dividiendo documentos en chunks...")
-for i, texto in enumerate(textos):
-    # Aseguramos que el texto no esté vacío para evitar errores
-    if not texto.strip():
-        continue
-        
-    chunks = dividir_texto(texto, tamano=1000, overlap=200)
-    for j, chunk in enumerate(chunks):
-        todos_los_chunks.append(chunk)
-        metadatos.append({
-            "chunk_id": len(todos_los_chunks)-1,
-            "fuente": fuentes[i],
-            "texto": chunk.strip() # Guarda el texto real para la fase de consulta
-        })
-
-print(f"→ {len(todos_los_chunks)} chunks creados listos para vectorizar.")
+    return list(iterar_chunks(texto, tamano, overlap))
 
 # ----------------------------------------
 ## 3. Generar Embeddings (Usando LM Studio API)
 # ----------------------------------------
-from openai import OpenAI
-
-try:
-    # Conexión a la API de LM Studio
-    cliente_api = OpenAI(base_url=LM_STUDIO_URL, api_key="lm-studio") 
-except Exception as e:
-    print(f"❌ ERROR: No se pudo crear el cliente de OpenAI. ¿Está el servidor LM Studio corriendo? {e}")
-    exit()
+import asyncio
+from openai import AsyncOpenAI
 
-embeddings_list = []
 BATCH_SIZE = 32 # Tamaño de lote recomendado para la API
+MAX_LOTES_CONCURRENTES = 16 # Lotes en vuelo a la vez contra LM Studio
+
+cliente_api = None # Se crea en main() (los procesos lectores no lo necesitan)
+
+async def vectorizar_lote(i, batch_chunks, sem):
+    """Vectoriza un lote de chunks; devuelve None si la API falla."""
+    async with sem:
+        try:
+            respuesta = await cliente_api.embeddings.create(
+                model=NOMBRE_MODELO_NOMIC,
+                input=batch_chunks
+            )
+            # Extraer los vectores (embeddings) de la respuesta
+            return np.asarray([data.embedding for data in respuesta.data], dtype='float32')
+        except Exception as e:
+            print(f"\n❌ ERROR de API en lote {i}. Asegúrate que el modelo '{NOMBRE_MODELO_NOMIC}' esté corriendo en LM Studio.")
+            print(f"Detalle del error: {e}")
+            return None
+
+async def generar_embeddings(chunks):
+    """Lanza todos los lotes en paralelo (acotados por un semáforo) y los une en orden.
+
+    Los chunks se ordenan por longitud antes de agruparlos en lotes, para que cada
+    lote tenga textos de tamaño parecido y el modelo no desperdicie cómputo en padding.
+    Devuelve una matriz (N, D) alineada con 'chunks' y una máscara de los chunks que
+    sí se vectorizaron (los de un lote fallido quedan en False).
+    """
+    sem = asyncio.Semaphore(MAX_LOTES_CONCURRENTES)
+    orden = np.array(sorted(range(len(chunks)), key=lambda i: len(chunks[i])), dtype=np.int64)
+    # La matriz se reserva una sola vez, al conocer la dimensión con el primer lote,
+    # y cada lote escribe sus filas directamente (sin listas intermedias ni copia final)
+    embeddings = None
+    generados = np.zeros(len(chunks), dtype=bool)
 
-print(f"🧠 Generando embeddings con LM Studio ({NOMBRE_MODELO_NOMIC})...")
+    async def procesar_lote(i):
+        nonlocal embeddings
+        batch_embeddings = await vectorizar_lote(i, [chunks[idx] for idx in orden[i:i + BATCH_SIZE]], sem)
+        if batch_embeddings is None:
+            return
+        if embeddings is None:
+            embeddings = np.empty((len(chunks), batch_embeddings.shape[1]), dtype='float32')
+        # Deshace el ordenamiento: cada vector vuelve a la posición original de su chunk
+        filas = orden[i:i + len(batch_embeddings)]
+        embeddings[filas] = batch_embeddings
+        generados[filas] = True
 
-# Generar embeddings por lotes
-for i in tqdm(range(0, len(todos_los_chunks), BATCH_SIZE), desc="Vectorizando Chunks"):
-    batch_chunks = todos_los_chunks[i:i + BATCH_SIZE]
-    
+    await tqdm.gather(*(procesar_lote(i) for i in range(0, len(orden), BATCH_SIZE)), desc="Vectorizando Chunks")
+    return embeddings, generados
+
+# Caché de embeddings en disco: clave = hash del (modelo, texto del chunk).
+# Al re-indexar tras añadir documentos, solo se vectorizan los chunks nuevos.
+RUTA_CACHE_EMB = os.path.join(CARPETA_RAG, "emb_cache.npz")
+
+def clave_chunk(chunk, nombre_modelo):
+    return hashlib.blake2b(f"{nombre_modelo}\0{chunk}".encode("utf-8"), digest_size=16).hexdigest()
+
+def cargar_embedding_local():
+    """Carga el modelo de sentence-transformers (GPU si hay), o None si no es posible."""
     try:
-        respuesta = cliente_api.embeddings.create(
-            model=NOMBRE_MODELO_NOMIC,
-            input=batch_chunks
-        )
-        
-        # Extraer los vectores (embeddings) de la respuesta
-        batch_embeddings = [data.embedding for data in respuesta.data]
-        embeddings_list.extend(batch_embeddings)
-        
+        import torch
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        print("ADVERTENCIA: No tienes sentence-transformers. Los chunks se vectorizarán con LM Studio.")
+        print("Instálalo con: pip install sentence-transformers")
+        return None
+    try:
+        dispositivo = "cuda" if torch.cuda.is_available() else "cpu"
+        return SentenceTransformer(NOMBRE_EMBEDDING_LOCAL, device=dispositivo, trust_remote_code=True)
     except Exception as e:
-        print(f"\n❌ ERROR de API en lote {i}. Asegúrate que el modelo '{NOMBRE_MODELO_NOMIC}' esté corriendo en LM Studio.")
-        print(f"Detalle del error: {e}")
-        # En caso de error, terminamos y usamos solo los que pudimos generar (si hay alguno)
-        break 
+        print(f"ADVERTENCIA: No se pudo cargar '{NOMBRE_EMBEDDING_LOCAL}' ({e}). Se usará LM Studio.")
+        return None
+
+def generar_embeddings_local(modelo, chunks):
+    """Vectoriza los chunks en el propio proceso; mismo formato de salida que generar_embeddings."""
+    embeddings = modelo.encode(chunks, batch_size=BATCH_SIZE, convert_to_numpy=True, show_progress_bar=True)
+    return np.ascontiguousarray(embeddings, dtype='float32'), np.ones(len(chunks), dtype=bool)
+
+# ----------------------------------------
+## 4. Creación y Guardado del Índice FAISS
+# ----------------------------------------
+def array_alineado(forma, alineacion=64):
+    """Reserva un array float32 C-contiguo cuyo inicio está alineado a 'alineacion' bytes.
+
+    Los kernels SIMD de FAISS leen los vectores en bloques de 32/64 bytes; con el buffer
+    alineado (y filas de 768 floats = 3072 bytes) ninguna lectura cruza ese límite.
+    """
+    nbytes = int(np.prod(forma)) * 4
+    crudo = np.empty(nbytes + alineacion, dtype=np.uint8)
+    desplazamiento = -crudo.ctypes.data % alineacion
+    return crudo[desplazamiento:desplazamiento + nbytes].view(np.float32).reshape(forma)
+
+def crear_indice(embeddings):
+    """Normaliza los embeddings y construye el índice FAISS según el tamaño del corpus."""
+    # FAISS trabaja sobre el buffer tal cual: debe ser float32 y C-contiguo
+    embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+    dimension = embeddings.shape[1]
+    # Vectores unitarios: el producto interno equivale a la similitud coseno
+    faiss.normalize_L2(embeddings)
+    num_vectores = len(embeddings)
+    # IVF: cada consulta solo recorre 'nprobe' de las 'nlist' listas invertidas
+    nlist = max(1, int(4 * math.sqrt(num_vectores)))
+    # PQ: 'm' sub-vectores de 8 bits cada uno (m debe dividir la dimensión)
+    m = dimension // 8
+    while m > 1 and dimension % m != 0:
+        m -= 1
 
-embeddings = np.array(embeddings_list, dtype='float32') 
+    # PQ necesita al menos 256 puntos por sub-cuantizador y el IVF unos 39 por lista
+    if num_vectores >= max(256, 39 * nlist) and m > 0:
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings) # Entrena los centroides IVF y los codebooks PQ
+        index.add(embeddings)   # Agrega los embeddings (comprimidos) al índice
+        index.nprobe = min(16, nlist)
+        print(f"→ Índice IVF{nlist},PQ{m}x8 (nprobe={index.nprobe})")
+    else:
+        # Corpus pequeño: no hay datos suficientes para entrenar IVF/PQ.
+        # Búsqueda exhaustiva por producto interno, guardando cada componente en FP16
+        # (la mitad de memoria que float32; usa QT_8bit para un cuarto)
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings) # QT_fp16 no necesita entrenamiento, pero QT_8bit sí
+        index.add(embeddings)   # Agrega los embeddings al índice
+        print(f"→ Índice SQfp16 ({num_vectores} vectores, insuficientes para IVF/PQ)")
+    return index
 
-if len(embeddings) == 0:
-    print("❌ No se pudieron generar embeddings. Revisa la consola de LM Studio.")
-    exit()
+def guardar_metadatos(metadatos):
+    """Guarda los metadatos como tabla Arrow IPC (chunks.arrow) o, sin pyarrow, como chunks.json.
+
+    El formato Arrow sin compresión se puede mapear en memoria desde chat.py: las filas
+    se leen bajo demanda en vez de crear un dict de Python por chunk al arrancar.
+    Devuelve el nombre del archivo escrito.
+    """
+    ruta_arrow = os.path.join(CARPETA_RAG, "chunks.arrow")
+    ruta_json = os.path.join(CARPETA_RAG, "chunks.json")
+    try:
+        import pyarrow as pa
+    except ImportError:
+        print("ADVERTENCIA: No tienes pyarrow. Los metadatos se guardarán en chunks.json.")
+        print("Instálalo con: pip install pyarrow")
+        pa = None
+
+    if pa is not None:
+        tabla = pa.table({
+            "chunk_id": [m["chunk_id"] for m in metadatos],
+            "fuente": [m["fuente"] for m in metadatos],
+            "texto": [m["texto"] for m in metadatos],
+        })
+        with pa.OSFile(ruta_arrow, "wb") as sink, pa.ipc.new_file(sink, tabla.schema) as writer:
+            writer.write_table(tabla)
+        ruta_vieja, archivo = ruta_json, "chunks.arrow"
+    else:
+        with open(ruta_json, "w", encoding="utf-8") as f:
+            json.dump(metadatos, f, ensure_ascii=False, indent=2)
+        ruta_vieja, archivo = ruta_arrow, "chunks.json"
 
-print(f"→ Embeddings generados: {embeddings.shape}")
+    # Borra el formato anterior para que chat.py no cargue metadatos desactualizados
+    if os.path.exists(ruta_vieja):
+        os.remove(ruta_vieja)
+    return archivo
 
 # ----------------------------------------
-## 4. Creación y Guardado del Índice FAISS
+## 5. Proceso Principal
 # ----------------------------------------
-print("💾 Creando y guardando índice FAISS...")
-dimension = embeddings.shape[1]
-# IndexFlatL2 es un índice simple de distancia euclidiana (L2)
-index = faiss.IndexFlatL2(dimension)
-index.add(embeddings) # Agrega los embeddings al índice
-
-# 5. Guardar todo en la carpeta de RAG
-faiss.write_index(index, os.path.join(CARPETA_RAG, "faiss.index"))
-with open(os.path.join(CARPETA_RAG, "chunks.json"), "w", encoding="utf-8") as f:
-    json.dump(metadatos, f, ensure_ascii=False, indent=2)
-
-print("\n🎉 ¡PROCESO DE INDEXACIÓN TERMINADO CON ÉXITO!")
-print(f"Los archivos de RAG están en: {os.path.abspath(CARPETA_RAG)}")
-print("   ├── faiss.index (Índice vectorial para búsqueda rápida)")
-print("   └── chunks.json (Metadatos y texto original)")
\ No newline at end of file
+def main():
+    global cliente_api
+
+    # Entrenamiento y carga del índice en todos los núcleos
+    faiss.omp_set_num_threads(os.cpu_count() or 1)
+
+    # Creamos la carpeta de salida si no existe
+    os.makedirs(CARPETA_RAG, exist_ok=True)
+
+    # 1. Carga de documentos
+    print("📚 Leyendo documentos de la carpeta:", CARPETA_DOCUMENTOS)
+    textos = []
+    fuentes = []
+    for cargar in (cargar_txt, cargar_pdf):
+        textos_leidos, fuentes_leidas = cargar()
+        textos.extend(textos_leidos)
+        fuentes.extend(fuentes_leidas)
+
+    if not textos:
+        print("❌ No se encontraron documentos para procesar. ¡Asegúrate de que 'context_files' no esté vacío!")
+        exit()
+
+    # 2. División en chunks
+    todos_los_chunks = []
+    metadatos = []
+
+    print("✂️ Dividiendo documentos en chunks...")
+    for i, texto in enumerate(textos):
+        # Aseguramos que el texto no esté vacío para evitar errores
+        if not texto.strip():
+            continue
+        
+        for j, chunk in enumerate(iterar_chunks(texto, tamano=1000, overlap=200)):
+            todos_los_chunks.append(chunk)
+            metadatos.append({
+                "chunk_id": len(todos_los_chunks)-1,
+                "fuente": fuentes[i],
+                "texto": chunk.strip() # Guarda el texto real para la fase de consulta
+            })
+
+    print(f"→ {len(todos_los_chunks)} chunks creados listos para vectorizar.")
+
+    # 3. Generar embeddings
+    modelo_local = cargar_embedding_local() if USAR_EMBEDDING_LOCAL else None
+    if modelo_local is not None:
+        embedder = {"tipo": "local", "modelo": NOMBRE_EMBEDDING_LOCAL}
+        print(f"🧠 Generando embeddings en local ({NOMBRE_EMBEDDING_LOCAL})...")
+    else:
+        try:
+            # Conexión a la API de LM Studio
+            cliente_api = AsyncOpenAI(base_url=LM_STUDIO_URL, api_key="lm-studio") 
+        except Exception as e:
+            print(f"❌ ERROR: No se pudo crear el cliente de OpenAI. ¿Está el servidor LM Studio corriendo? {e}")
+            exit()
+        embedder = {"tipo": "lm_studio", "modelo": NOMBRE_MODELO_NOMIC}
+        print(f"🧠 Generando embeddings con LM Studio ({NOMBRE_MODELO_NOMIC})...")
+
+    claves = [clave_chunk(c, embedder["modelo"]) for c in todos_los_chunks]
+    cache_emb = {}
+    if os.path.exists(RUTA_CACHE_EMB):
+        try:
+            with np.load(RUTA_CACHE_EMB) as datos:
+                cache_emb = dict(datos)
+        except Exception as e:
+            print(f"⚠️ No se pudo leer la caché de embeddings ({e}); se regenerará.")
+
+    # Chunks idénticos (solapamientos, cabeceras y pies de página repetidos) comparten
+    # clave: solo se vectoriza el primero y el resto toma su vector de la caché
+    faltantes = []
+    claves_pendientes = set()
+    for i, k in enumerate(claves):
+        if k not in cache_emb and k not in claves_pendientes:
+            claves_pendientes.add(k)
+            faltantes.append(i)
+    num_unicos = len(set(claves))
+    print(f"→ Caché de embeddings: {num_unicos - len(faltantes)} reutilizados, {len(faltantes)} por generar "
+          f"({len(claves) - num_unicos} chunks duplicados).")
+
+    # Generar embeddings por lotes (solo de los chunks que no están en caché)
+    if faltantes:
+        chunks_faltantes = [todos_los_chunks[i] for i in faltantes]
+        if modelo_local is not None:
+            nuevos, generados = generar_embeddings_local(modelo_local, chunks_faltantes)
+        else:
+            nuevos, generados = asyncio.run(generar_embeddings(chunks_faltantes))
+        for pos, i in enumerate(faltantes):
+            if generados[pos]:
+                cache_emb[claves[i]] = nuevos[pos]
+        np.savez_compressed(RUTA_CACHE_EMB, **cache_emb)
+
+    # En caso de error, usamos solo los que pudimos generar (si hay alguno),
+    # descartando también sus metadatos para que las posiciones del índice coincidan
+    validos = [i for i, k in enumerate(claves) if k in cache_emb]
+    if len(validos) < len(claves):
+        print(f"⚠️ {len(claves) - len(validos)} chunks sin embedding; se omiten del índice.")
+        metadatos = [metadatos[i] for i in validos]
+
+    # Matriz final reservada de una vez y rellenada fila a fila desde la caché
+    dimension = len(cache_emb[claves[validos[0]]]) if validos else 0
+    embeddings = array_alineado((len(validos), dimension))
+    for fila, i in enumerate(validos):
+        embeddings[fila] = cache_emb[claves[i]]
+
+    if len(embeddings) == 0:
+        print("❌ No se pudieron generar embeddings. Revisa la consola de LM Studio.")
+        exit()
+
+    print(f"→ Embeddings generados: {embeddings.shape}")
+
+    # 4. Creación y guardado del índice FAISS
+    print("💾 Creando y guardando índice FAISS...")
+    # Normas ||x||² de los embeddings originales (antes de normalizar), una por fila del
+    # índice: con ellas d²(q,x) = ||q||² + ||x||² - 2·q·x se calcula con un solo producto
+    # matriz-vector en cualquier re-ranking o filtro, y se puede cambiar de métrica sin re-vectorizar
+    normas = np.einsum('ij,ij->i', embeddings, embeddings).astype('float32')
+
+    index = crear_indice(embeddings)
+
+    # 5. Guardar todo en la carpeta de RAG
+    faiss.write_index(index, os.path.join(CARPETA_RAG, "faiss.index"))
+    np.save(os.path.join(CARPETA_RAG, "norms.npy"), normas)
+    # Registra qué modelo generó los vectores: chat.py debe vectorizar las preguntas con el mismo
+    with open(os.path.join(CARPETA_RAG, "embedder.json"), "w", encoding="utf-8") as f:
+        json.dump(embedder, f, ensure_ascii=False, indent=2)
+    archivo_chunks = guardar_metadatos(metadatos)
+
+    print("\n🎉 ¡PROCESO DE INDEXACIÓN TERMINADO CON ÉXITO!")
+    print(f"Los archivos de RAG están en: {os.path.abspath(CARPETA_RAG)}")
+    print("   ├── faiss.index (Índice vectorial para búsqueda rápida)")
+    print("   ├── norms.npy (Normas ||x||² de los embeddings originales)")
+    print("   ├── embedder.json (Modelo con el que se generaron los embeddings)")
+    print(f"   └── {archivo_chunks} (Metadatos y texto original)")
+
+
+if __name__ == "__main__":
+    main()